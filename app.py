@@ -1,15 +1,24 @@
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, Response, g
 import os
+import gzip
+import hmac
+import json
 import logging
+import re
 import time
+from datetime import datetime
 from dotenv import load_dotenv
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
 # 리팩토링된 모듈 임포트
-from src.dart_client import DARTClient, DARTApiException  #<- 'src.' 라는 새 주소 추가
+from src.dart_client import DARTClient, DARTApiException, DARTUnavailableException  #<- 'src.' 라는 새 주소 추가
 from src.ai_analyzer import AIAnalyzer                    #<- 'src.' 라는 새 주소 추가
 from src import formatters                                #<- 'src.' 라는 새 주소 추가
+from src.cache import TTLCache
+from src.disclosure_sync import DisclosureSyncWorker
+from src.timeseries_store import TimeSeriesStore, ACCOUNTS
+from src import resilience
 
 # .env 파일에서 환경 변수 로드
 load_dotenv()
@@ -50,15 +59,86 @@ limiter = Limiter(
     default_limits=["100 per hour", "10 per minute"]
 )
 
+# --- 캐시 설정 ---
+# 공시 동기화 워커가 도는 프로세스는 변경분만 무효화되므로 TTL을 길게(기본 30일) 가져갈 수 있음
+SYNC_ENABLED = os.getenv('DART_SYNC_ENABLED', 'true').lower() == 'true'
+# `python app.py` debug 실행 시 리로더 부모 프로세스는 요청을 처리하지 않으므로 워커 불필요
+_IS_RELOADER_PARENT = (
+    __name__ == '__main__'
+    and os.getenv('FLASK_ENV') != 'production'
+    and os.getenv('WERKZEUG_RUN_MAIN') != 'true'
+)
+SYNC_ACTIVE = SYNC_ENABLED and not _IS_RELOADER_PARENT
+DEFAULT_CACHE_TTL = 30 * 24 * 3600 if SYNC_ACTIVE else 3600
+CACHE_TTL = int(os.getenv('CACHE_TTL', DEFAULT_CACHE_TTL))
+
+statement_cache = TTLCache(ttl=CACHE_TTL)
+analysis_cache = TTLCache(ttl=CACHE_TTL)
+
+# 다년도 주요계정 시계열 저장소 (분석 프롬프트에 포함할 연도 수)
+timeseries_store = TimeSeriesStore(os.getenv('TIMESERIES_DB_PATH', 'data/timeseries.db'))
+TREND_YEARS = int(os.getenv('TREND_YEARS', 5))
+# fnlttSinglAcnt는 2015년 사업보고서부터 제공
+TIMESERIES_MIN_YEAR = 2015
+# /api/timeseries 요청 1건이 DART에서 새로 조회할 수 있는 최대 보고서 수
+TIMESERIES_MAX_FETCHES = int(os.getenv('TIMESERIES_MAX_FETCHES', 10))
+CORP_CODE_PATTERN = re.compile(r'^\d{8}$')
+
+# --- 외부 호출 보호 설정 ---
+# 요청 하나가 DART/Gemini 호출에 쓸 수 있는 전체 시간 예산(초)
+REQUEST_DEADLINE = float(os.getenv('REQUEST_DEADLINE', 45))
+BREAKER_SETTINGS = {
+    'failure_threshold': int(os.getenv('BREAKER_FAILURE_THRESHOLD', 5)),
+    'reset_timeout': float(os.getenv('BREAKER_RESET_TIMEOUT', 30))
+}
+
 # --- 클라이언트 초기화 ---
 try:
-    dart_client = DARTClient(os.getenv('DART_API_KEY'))
-    ai_analyzer = AIAnalyzer(os.getenv('GEMINI_API_KEY'))
+    dart_client = DARTClient(
+        os.getenv('DART_API_KEY'),
+        statement_cache=statement_cache,
+        timeseries_store=timeseries_store,
+        timeout=float(os.getenv('DART_TIMEOUT', 20)),
+        hedge_delay=float(os.getenv('DART_HEDGE_DELAY', 0)),
+        breaker=resilience.get_breaker('dart', **BREAKER_SETTINGS)
+    )
+    ai_analyzer = AIAnalyzer(
+        os.getenv('GEMINI_API_KEY'),
+        timeout=float(os.getenv('GEMINI_TIMEOUT', 40)),
+        breaker=resilience.get_breaker('gemini', **BREAKER_SETTINGS)
+    )
     logger.info("API 클라이언트 초기화 완료")
 except ValueError as e:
     logger.error(f"API 키 설정 오류: {e}")
     exit(1)
 
+# --- 공시 동기화 워커 ---
+def invalidate_analyses(corp_code, year):
+    """정정/신규 사업보고서가 영향을 주는 AI 분석 캐시 제거
+
+    year년 사업보고서는 year-2 ~ year년 수치를 바꾸고, 분석에는 data_year 이전 TREND_YEARS년 추이가
+    들어가므로 data_year가 year-2 ~ year+TREND_YEARS-1인 분석이 모두 영향을 받습니다.
+    """
+    first, last = int(year) - 2, int(year) + TREND_YEARS - 1
+    removed = analysis_cache.invalidate_where(
+        lambda key: key[0] == corp_code and first <= int(key[1]) <= last
+    )
+    if removed:
+        logger.info(f"AI 분석 캐시 무효화: {corp_code} {year}년 ({removed}건)")
+
+disclosure_sync_worker = DisclosureSyncWorker(
+    dart_client,
+    interval=int(os.getenv('DART_SYNC_INTERVAL', 600)),
+    listeners=[invalidate_analyses],
+    timeseries_store=timeseries_store
+)
+
+# 요청을 처리하는 모든 프로세스에서 워커 실행 (커서와 캐시가 프로세스별이므로)
+if SYNC_ACTIVE:
+    disclosure_sync_worker.start()
+    # gunicorn --preload 등 fork 후에는 스레드가 사라지므로 자식 프로세스에서 다시 시작
+    os.register_at_fork(after_in_child=disclosure_sync_worker.start)
+
 # --- 유틸리티 함수 ---
 def api_response(success=True, data=None, message="", error="", status_code=200):
     """통일된 API 응답 형식"""
@@ -81,6 +161,31 @@ def validate_request_data(data, required_fields):
     
     return None
 
+# 상장기업 인덱스 직렬화 결과 캐시 (version -> gzip 바이트)
+_company_index_cache = {}
+
+def _get_compressed_company_index():
+    """상장기업 인덱스를 JSON 직렬화 후 gzip 압축 (버전별 1회만 수행)"""
+    index = dart_client.get_listed_company_index()
+    version = index['version']
+    if version not in _company_index_cache:
+        payload = json.dumps(index, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        _company_index_cache.clear()
+        _company_index_cache[version] = gzip.compress(payload, compresslevel=9)
+        logger.info(f"기업 인덱스 생성: v{version}, {len(payload)} -> {len(_company_index_cache[version])} bytes")
+    return version, _company_index_cache[version]
+
+# --- 요청 데드라인 ---
+@app.before_request
+def start_request_deadline():
+    g.deadline_token = resilience.start_deadline(REQUEST_DEADLINE)
+
+@app.teardown_request
+def reset_request_deadline(exc):
+    token = g.pop('deadline_token', None)
+    if token is not None:
+        resilience.reset_deadline(token)
+
 # --- 에러 핸들러 ---
 @app.errorhandler(DARTApiException)
 def handle_dart_api_exception(e):
@@ -141,18 +246,44 @@ def search_companies():
         logger.error(f"기업 검색 오류: {e}", exc_info=True)
         return api_response(success=False, error=f"검색 중 오류가 발생했습니다: {str(e)}", status_code=500)
 
+@app.route('/api/companies/index', methods=['GET'])
+@limiter.limit("30 per minute")
+def get_company_index():
+    """프론트엔드 즉시 검색용 상장기업 인덱스 (gzip, ETag 캐시)"""
+    version, body = _get_compressed_company_index()
+    etag = f'"{version}"'
+    headers = {
+        'ETag': etag,
+        'Cache-Control': 'public, max-age=3600, stale-while-revalidate=86400',
+        'Vary': 'Accept-Encoding'
+    }
+    
+    if etag in request.headers.get('If-None-Match', ''):
+        return Response(status=304, headers=headers)
+    
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        headers['Content-Encoding'] = 'gzip'
+    else:
+        body = gzip.decompress(body)
+    
+    return Response(body, status=200, mimetype='application/json', headers=headers)
+
 @app.route('/api/select', methods=['POST'])
 @limiter.limit("10 per minute")
 def select_company():
     """사용자가 선택한 기업의 재무 정보를 가져와 세션에 저장 (2024년 데이터 우선)"""
     try:
         data = request.get_json()
-        error = validate_request_data(data, ['corp_code', 'corp_name'])
+        error = validate_request_data(data, ['corp_code'])
         if error:
             return api_response(success=False, error=error, status_code=400)
 
+        # 기업명은 클라이언트 값 대신 DART 기업 목록에서 조회 (분석 캐시가 사용자 간 공유되므로)
         corp_code = formatters.sanitize_input(data.get('corp_code', ''))
-        corp_name = formatters.sanitize_input(data.get('corp_name', ''))
+        company = dart_client.get_company(corp_code)
+        if company is None:
+            return api_response(success=False, error="존재하지 않는 기업코드입니다.", status_code=404)
+        corp_name = company.corp_name
         
         logger.info(f"기업 선택: {corp_name} ({corp_code})")
         
@@ -167,6 +298,9 @@ def select_company():
                 year_used = year
                 logger.info(f"{corp_name} {year}년 재무데이터 조회 성공")
                 break
+            except DARTUnavailableException as e:
+                logger.warning(f"DART 호출 불가로 조회 중단: {e}")
+                return api_response(success=False, error=str(e), status_code=503)
             except DARTApiException as e:
                 logger.warning(f"{corp_name} {year}년 데이터 조회 실패: {e}")
                 continue
@@ -189,6 +323,15 @@ def select_company():
         session['data_year'] = year_used
         session['selected_at'] = str(int(time.time()))
         
+        # 추이 분석용 과거 연도 채우기 (실패해도 선택은 유지하되 분석 결과는 캐시하지 않음)
+        try:
+            trend_years = range(int(year_used) - TREND_YEARS + 1, int(year_used) + 1)
+            timeseries_store.ensure(corp_code, trend_years, dart_client)
+            session['trend_complete'] = True
+        except DARTApiException as e:
+            logger.warning(f"{corp_name} 다년도 데이터 적재 실패: {e}")
+            session['trend_complete'] = False
+        
         return api_response(
             success=True,
             message=f"{corp_name} ({year_used}년 데이터) 선택 완료",
@@ -199,6 +342,63 @@ def select_company():
         logger.error(f"기업 선택 오류: {e}", exc_info=True)
         return api_response(success=False, error=f"기업 선택 중 오류가 발생했습니다: {str(e)}", status_code=500)
 
+@app.route('/api/timeseries', methods=['POST'])
+@limiter.limit("30 per minute")
+def get_timeseries():
+    """여러 기업의 다년도 주요계정 시계열을 연도 축에 맞춰 반환"""
+    try:
+        data = request.get_json()
+        error = validate_request_data(data, ['corp_codes', 'start_year', 'end_year'])
+        if error:
+            return api_response(success=False, error=error, status_code=400)
+        
+        corp_codes = data.get('corp_codes')
+        if not isinstance(corp_codes, list) or len(corp_codes) > 10:
+            return api_response(success=False, error="corp_codes는 최대 10개의 목록이어야 합니다.", status_code=400)
+        if not all(isinstance(code, str) and CORP_CODE_PATTERN.match(code) for code in corp_codes):
+            return api_response(success=False, error="기업코드는 8자리 숫자여야 합니다.", status_code=400)
+        
+        try:
+            start_year, end_year = int(data['start_year']), int(data['end_year'])
+        except (TypeError, ValueError):
+            return api_response(success=False, error="연도는 숫자로 입력해주세요.", status_code=400)
+        start_year = max(start_year, TIMESERIES_MIN_YEAR)
+        end_year = min(end_year, datetime.now().year)
+        if start_year > end_year:
+            return api_response(
+                success=False,
+                error=f"조회 기간은 {TIMESERIES_MIN_YEAR}년부터 올해 사이여야 합니다.",
+                status_code=400
+            )
+        
+        accounts = data.get('accounts') or ACCOUNTS
+        if not isinstance(accounts, list) or not all(isinstance(a, str) for a in accounts):
+            return api_response(success=False, error="accounts는 계정명 문자열 목록이어야 합니다.", status_code=400)
+        fs_div = data.get('fs_div', 'auto')
+        if fs_div not in ('auto', 'CFS', 'OFS'):
+            return api_response(success=False, error="fs_div는 auto, CFS, OFS 중 하나여야 합니다.", status_code=400)
+        
+        # 저장소에 없는 연도만 DART에서 채움 (요청당 조회 수 제한, 초과분은 빈 값으로 반환)
+        remaining_fetches = TIMESERIES_MAX_FETCHES
+        for corp_code in corp_codes:
+            remaining_fetches -= timeseries_store.ensure(
+                corp_code, range(start_year, end_year + 1), dart_client, max_fetches=remaining_fetches
+            )
+        
+        result = timeseries_store.query(corp_codes, start_year, end_year, accounts, fs_div)
+        return api_response(
+            success=True,
+            data=result,
+            message=f"{len(corp_codes)}개 기업, {len(result['years'])}개 연도 시계열 조회 완료"
+        )
+        
+    except DARTApiException as e:
+        logger.warning(f"시계열 적재 중 DART 오류: {e}")
+        return api_response(success=False, error=str(e), status_code=503)
+    except Exception as e:
+        logger.error(f"시계열 조회 오류: {e}", exc_info=True)
+        return api_response(success=False, error=f"시계열 조회 중 오류가 발생했습니다: {str(e)}", status_code=500)
+
 def _get_session_data():
     """세션에서 회사 이름과 재무 데이터를 가져오는 헬퍼 함수"""
     corp_name = session.get('corp_name')
@@ -211,6 +411,41 @@ def _get_session_data():
     logger.info(f"세션 데이터 조회: {corp_name} ({data_year}년)")
     return corp_name, financial_data
 
+def _get_trend_data():
+    """선택 기업의 최근 TREND_YEARS년 주요계정 추이 (로컬 저장소만 조회)"""
+    corp_code = session.get('corp_code')
+    data_year = session.get('data_year')
+    if not corp_code or not data_year:
+        return None
+    
+    end_year = int(data_year)
+    result = timeseries_store.query([corp_code], end_year - TREND_YEARS + 1, end_year)
+    return TimeSeriesStore.to_prompt_table(result, corp_code)
+
+def _get_cached_analysis(kind, corp_name, financial_data, analyze):
+    """(기업코드, 연도, 분석종류) 단위로 AI 분석 결과 캐시"""
+    cache_key = (session.get('corp_code'), session.get('data_year'), kind)
+    cached = analysis_cache.get(cache_key)
+    if cached is not None:
+        logger.info(f"AI 분석 캐시 사용: {corp_name} ({kind})")
+        return cached
+    
+    try:
+        analysis = analyze(corp_name, financial_data, _get_trend_data())
+    except ConnectionError:
+        # Gemini 장애 중에는 만료된 분석 결과라도 있으면 제공
+        stale = analysis_cache.get_stale(cache_key)
+        if stale is not None:
+            logger.warning(f"AI 장애로 만료된 분석 캐시 사용: {corp_name} ({kind})")
+            return stale
+        raise
+    
+    formatted_analysis = formatters.format_analysis_result(analysis)
+    # 추이 데이터가 빠진 분석이 다른 사용자에게 장기간 재사용되지 않도록 함
+    if session.get('trend_complete'):
+        analysis_cache.set(cache_key, formatted_analysis)
+    return formatted_analysis
+
 @app.route('/api/business-analysis', methods=['GET'])
 @limiter.limit("5 per minute")
 def get_business_analysis():
@@ -219,8 +454,7 @@ def get_business_analysis():
         corp_name, financial_data = _get_session_data()
         logger.info(f"사업 분석 요청: {corp_name}")
         
-        analysis = ai_analyzer.business_analysis(corp_name, financial_data)
-        formatted_analysis = formatters.format_analysis_result(analysis)
+        formatted_analysis = _get_cached_analysis('business', corp_name, financial_data, ai_analyzer.business_analysis)
         
         return api_response(
             success=True,
@@ -242,8 +476,7 @@ def get_financial_analysis():
         corp_name, financial_data = _get_session_data()
         logger.info(f"재무 분석 요청: {corp_name}")
         
-        analysis = ai_analyzer.financial_analysis(corp_name, financial_data)
-        formatted_analysis = formatters.format_analysis_result(analysis)
+        formatted_analysis = _get_cached_analysis('financial', corp_name, financial_data, ai_analyzer.financial_analysis)
         
         return api_response(
             success=True,
@@ -265,8 +498,7 @@ def get_audit_points():
         corp_name, financial_data = _get_session_data()
         logger.info(f"감사 포인트 분석 요청: {corp_name}")
         
-        analysis = ai_analyzer.audit_points_analysis(corp_name, financial_data)
-        formatted_analysis = formatters.format_analysis_result(analysis)
+        formatted_analysis = _get_cached_analysis('audit', corp_name, financial_data, ai_analyzer.audit_points_analysis)
         
         return api_response(
             success=True,
@@ -298,7 +530,7 @@ def chat_with_ai():
         
         logger.info(f"채팅 질문: {corp_name} - {question[:50]}...")
         
-        answer = ai_analyzer.chat_response(corp_name, financial_data, question)
+        answer = ai_analyzer.chat_response(corp_name, financial_data, question, _get_trend_data())
         formatted_answer = formatters.format_analysis_result(answer)
         
         return api_response(
@@ -322,6 +554,26 @@ def health_check():
         message="서비스가 정상 작동 중입니다."
     )
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """외부 서비스별 서킷 브레이커 상태 및 캐시 현황 (METRICS_TOKEN 설정 시에만 제공)"""
+    # 리버스 프록시 뒤에서는 모든 요청이 로컬 주소로 들어오므로 주소 대신 토큰으로만 인증
+    metrics_token = os.getenv('METRICS_TOKEN')
+    if not metrics_token:
+        return api_response(success=False, error="요청한 경로를 찾을 수 없습니다.", status_code=404)
+    
+    provided = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    if not hmac.compare_digest(provided, metrics_token):
+        return api_response(success=False, error="접근 권한이 없습니다.", status_code=403)
+    
+    return api_response(
+        success=True,
+        data={
+            'circuit_breakers': resilience.breaker_metrics(),
+            'cache': {'statements': len(statement_cache), 'analyses': len(analysis_cache)}
+        }
+    )
+
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
     debug = os.getenv('FLASK_ENV') != 'production'
@@ -3,13 +3,21 @@
 import google.generativeai as genai
 import json
 import re
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Optional
+from src.resilience import CircuitBreaker, budget_timeout, call_with_timeout, get_breaker, run_with_budget
 from src.prompts import BUSINESS_ANALYSIS, FINANCIAL_ANALYSIS, AUDIT_POINTS_ANALYSIS, CHAT_RESPONSE
 
 class AIAnalyzer:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, timeout: float = 60, breaker: Optional[CircuitBreaker] = None):
         if not api_key:
             raise ValueError("Gemini API 키가 필요합니다.")
+        # 응답 생성 최대 대기 시간 (요청 데드라인이 더 짧으면 그 값을 사용)
+        self.timeout = timeout
+        self.breaker = breaker or get_breaker('gemini')
+        # Gemini 호출 전용 스레드 풀 (DART 호출과 공유하지 않음)
+        self._executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='gemini')
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel(
             'gemini-2.5-flash',
@@ -24,7 +32,13 @@ class AIAnalyzer:
     def _generate_response(self, prompt: str) -> str:
         """AI 모델 응답 생성 및 후처리"""
         try:
-            response = self.model.generate_content(prompt)
+            timeout = budget_timeout(self.timeout)
+            # SDK에도 타임아웃을 전달해 시간 초과 시 스레드가 반환되도록 함
+            call = partial(
+                call_with_timeout, self._executor, self.model.generate_content, timeout,
+                prompt, request_options={'timeout': timeout}
+            )
+            response = self.breaker.call(run_with_budget, call, timeout, self.timeout)
             result_text = response.text
             
             # 1단계: 인식사항 섹션 제거
@@ -77,7 +91,8 @@ class AIAnalyzer:
         
         return text
 
-    def _create_prompt(self, template: str, company_name: str, financial_data: Dict, user_question: str = "") -> str:
+    def _create_prompt(self, template: str, company_name: str, financial_data: Dict, user_question: str = "",
+                       trend_data: Optional[Dict] = None) -> str:
         """프롬프트 생성 로직 - 데이터 출처 명시"""
         # 재무데이터에 출처 정보 추가
         enhanced_data = {
@@ -85,22 +100,26 @@ class AIAnalyzer:
             "데이터_성격": "감사받은 확정 실적 (추정치 아님)",
             "원본_데이터": financial_data
         }
+        if trend_data:
+            # 연도별 주요계정 (TimeSeriesStore.to_prompt_table 형식)
+            enhanced_data["다년도_주요계정"] = trend_data
         
         data_json = json.dumps(enhanced_data, ensure_ascii=False, indent=2)
         return template.format(company_name=company_name, financial_data=data_json, user_question=user_question)
 
-    def business_analysis(self, company_name: str, financial_data: Dict) -> str:
-        prompt = self._create_prompt(BUSINESS_ANALYSIS, company_name, financial_data)
+    def business_analysis(self, company_name: str, financial_data: Dict, trend_data: Optional[Dict] = None) -> str:
+        prompt = self._create_prompt(BUSINESS_ANALYSIS, company_name, financial_data, trend_data=trend_data)
         return self._generate_response(prompt)
     
-    def financial_analysis(self, company_name: str, financial_data: Dict) -> str:
-        prompt = self._create_prompt(FINANCIAL_ANALYSIS, company_name, financial_data)
+    def financial_analysis(self, company_name: str, financial_data: Dict, trend_data: Optional[Dict] = None) -> str:
+        prompt = self._create_prompt(FINANCIAL_ANALYSIS, company_name, financial_data, trend_data=trend_data)
         return self._generate_response(prompt)
     
-    def audit_points_analysis(self, company_name: str, financial_data: Dict) -> str:
-        prompt = self._create_prompt(AUDIT_POINTS_ANALYSIS, company_name, financial_data)
+    def audit_points_analysis(self, company_name: str, financial_data: Dict, trend_data: Optional[Dict] = None) -> str:
+        prompt = self._create_prompt(AUDIT_POINTS_ANALYSIS, company_name, financial_data, trend_data=trend_data)
         return self._generate_response(prompt)
         
-    def chat_response(self, company_name: str, financial_data: Dict, user_question: str) -> str:
-        prompt = self._create_prompt(CHAT_RESPONSE, company_name, financial_data, user_question)
+    def chat_response(self, company_name: str, financial_data: Dict, user_question: str,
+                      trend_data: Optional[Dict] = None) -> str:
+        prompt = self._create_prompt(CHAT_RESPONSE, company_name, financial_data, user_question, trend_data)
         return self._generate_response(prompt)
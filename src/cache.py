@@ -0,0 +1,60 @@
+# cache.py
+"""DART 재무제표 및 AI 분석 결과를 보관하는 스레드 안전 메모리 캐시입니다."""
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+class TTLCache:
+    """만료 시간(TTL)을 가진 단순 키-값 캐시
+
+    ttl이 None이면 만료되지 않으며, 공시 동기화 워커가 변경된 항목만 무효화합니다.
+    만료된 항목은 max_entries에 의해 밀려나거나 무효화될 때까지 get_stale로 조회할 수 있습니다.
+    """
+    def __init__(self, ttl: Optional[float] = None, max_entries: int = 1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """유효한 항목 반환 (없거나 만료되었으면 None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if self.ttl is not None and time.time() - stored_at > self.ttl:
+                # 만료 항목은 외부 장애 시 get_stale로 제공할 수 있도록 남겨둠
+                return None
+            return value
+
+    def get_stale(self, key: Hashable) -> Optional[Any]:
+        """만료 여부와 관계없이 항목 반환 (외부 서비스 장애 시 대체 응답용)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[1] if entry is not None else None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                # 가장 오래된 항목부터 제거
+                oldest_key = min(self._entries, key=lambda k: self._entries[k][0])
+                del self._entries[oldest_key]
+            self._entries[key] = (time.time(), value)
+
+    def invalidate(self, key: Hashable) -> bool:
+        """단일 항목 무효화 (삭제 여부 반환)"""
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """조건에 맞는 키를 모두 무효화하고 삭제된 개수 반환"""
+        with self._lock:
+            targets = [key for key in self._entries if predicate(key)]
+            for key in targets:
+                del self._entries[key]
+            return len(targets)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -3,9 +3,18 @@ import requests
 import xml.etree.ElementTree as ET
 import zipfile
 import io
+import json
+import hashlib
 import logging
-from typing import Dict, List
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional
 from dataclasses import dataclass
+from src.cache import TTLCache
+from src.timeseries_store import TimeSeriesStore
+from src.resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, budget_timeout, describe_error, get_breaker, hedged_call, run_with_budget
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +22,14 @@ class DARTApiException(Exception):
     """DART API 관련 커스텀 예외"""
     pass
 
+class DARTNotFoundException(DARTApiException):
+    """DART가 해당 재무제표가 없다고 응답함 (status 013)"""
+    pass
+
+class DARTUnavailableException(DARTApiException):
+    """서킷 브레이커 차단 또는 시간 예산 초과로 DART를 호출할 수 없음"""
+    pass
+
 @dataclass
 class CompanyInfo:
     corp_code: str
@@ -21,46 +38,197 @@ class CompanyInfo:
 
 class DARTClient:
     """DART API 클라이언트"""
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, corp_list_ttl: int = 6 * 3600, statement_cache: Optional[TTLCache] = None,
+                 timeout: float = 20, hedge_delay: float = 0, breaker: Optional[CircuitBreaker] = None,
+                 timeseries_store: Optional[TimeSeriesStore] = None):
         if not api_key:
             raise ValueError("DART API 키가 필요합니다.")
         self.api_key = api_key
         self.base_url = "https://opendart.fss.or.kr/api"
+        # 호출별 최대 타임아웃 (요청 데드라인이 더 짧으면 그 값을 사용)
+        self.timeout = timeout
+        # 0이면 헤지 요청 비활성화
+        self.hedge_delay = hedge_delay
+        self.breaker = breaker or get_breaker('dart')
+        # 헤지 요청 전용 스레드 풀 (다른 외부 서비스와 공유하지 않음)
+        self._executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='dart')
+        # corpCode.xml은 수 MB 규모의 ZIP이므로 메모리에 보관하고 주기적으로만 갱신
+        self.corp_list_ttl = corp_list_ttl
+        self._corp_list: List[CompanyInfo] = []
+        self._corp_list_loaded_at = 0.0
+        self._corp_index: Optional[Dict] = None
+        self._corp_by_code: Dict[str, CompanyInfo] = {}
+        self._corp_lock = threading.Lock()
+        # (corp_code, year) -> 재무제표 응답. 정정공시 발생 시 DisclosureSyncWorker가 무효화
+        self.statement_cache = statement_cache if statement_cache is not None else TTLCache(ttl=3600)
+        # 조회에 성공한 재무제표를 다년도 시계열 저장소에 누적
+        self.timeseries_store = timeseries_store
 
-    def _request_get(self, url: str, params: Dict) -> requests.Response:
-        """GET 요청 래퍼"""
+    def _request_get(self, url: str, params: Dict, hedge: bool = False) -> requests.Response:
+        """GET 요청 래퍼 (데드라인, 서킷 브레이커, 선택적 헤지 요청 적용)"""
         try:
-            response = requests.get(url, params=params, timeout=20)
-            response.raise_for_status()
-            return response
+            timeout = budget_timeout(self.timeout)
+
+            def do_get() -> requests.Response:
+                response = requests.get(url, params=params, timeout=timeout)
+                response.raise_for_status()
+                return response
+
+            if hedge and self.hedge_delay > 0:
+                call = partial(hedged_call, self._executor, do_get, self.hedge_delay, timeout)
+            else:
+                call = do_get
+            return self.breaker.call(run_with_budget, call, timeout, self.timeout)
+        except (CircuitOpenError, DeadlineExceeded) as e:
+            raise DARTUnavailableException(f"DART API 호출 불가: {e}")
         except requests.exceptions.RequestException as e:
-            raise DARTApiException(f"DART API 네트워크 오류: {e}")
+            # 원본 메시지에는 crtfc_key가 포함된 URL이 있으므로 노출하지 않음
+            raise DARTApiException(f"DART API 네트워크 오류: {describe_error(e)}")
 
     def search_company(self, company_name: str) -> List[CompanyInfo]:
         """회사명으로 DART 기업 검색"""
+        keyword = company_name.lower()
+        companies = [c for c in self._get_corp_list() if keyword in c.corp_name.lower()]
+        return companies[:10]
+
+    def get_company(self, corp_code: str) -> Optional[CompanyInfo]:
+        """기업코드로 기업 정보 조회 (없으면 None)"""
+        self._get_corp_list()
+        return self._corp_by_code.get(corp_code)
+
+    def get_listed_company_index(self) -> Dict:
+        """상장기업 검색용 압축 인덱스 (프론트엔드 즉시 검색용)
+
+        반환 형식: {'version': str, 'fields': [...], 'companies': [[corp_code, corp_name, stock_code], ...]}
+        version은 내용 해시이므로 기업 목록이 바뀔 때만 달라집니다.
+        """
+        self._get_corp_list()
+        return self._corp_index
+
+    def _get_corp_list(self) -> List[CompanyInfo]:
+        """전체 기업 목록 조회 (TTL 동안 메모리 캐시 사용)"""
+        with self._corp_lock:
+            if self._corp_list and time.time() - self._corp_list_loaded_at < self.corp_list_ttl:
+                return self._corp_list
+
+            try:
+                companies = self._fetch_corp_list()
+            except DARTApiException:
+                if self._corp_list:
+                    logger.warning("기업 목록 갱신 실패, 기존 목록 사용")
+                    return self._corp_list
+                raise
+
+            self._corp_list = companies
+            self._corp_list_loaded_at = time.time()
+            self._corp_index = self._build_listed_index(companies)
+            self._corp_by_code = {c.corp_code: c for c in companies}
+            logger.info(f"기업 목록 갱신: 전체 {len(companies)}개, 상장 {len(self._corp_index['companies'])}개")
+            return self._corp_list
+
+    def _fetch_corp_list(self) -> List[CompanyInfo]:
+        """corpCode.xml 다운로드 및 파싱"""
         url = f"{self.base_url}/corpCode.xml"
         params = {'crtfc_key': self.api_key}
         response = self._request_get(url, params)
         
         content = self._extract_zip_content(response.content)
         xml_string = self._decode_content(content)
-        root = ET.fromstring(xml_string)
+        try:
+            root = ET.fromstring(xml_string)
+        except ET.ParseError as e:
+            raise DARTApiException(f"기업 목록 파싱 오류: {e}")
         
         companies = []
         for corp in root.findall('.//list'):
-            corp_name_el = corp.find('corp_name')
-            if corp_name_el is not None and company_name.lower() in corp_name_el.text.lower():
-                companies.append(CompanyInfo(
-                    corp_code=corp.findtext('corp_code', ''),
-                    corp_name=corp.findtext('corp_name', ''),
-                    stock_code=corp.findtext('stock_code', '')
-                ))
-        return companies[:10]
+            corp_name = (corp.findtext('corp_name') or '').strip()
+            if not corp_name:
+                continue
+            companies.append(CompanyInfo(
+                corp_code=corp.findtext('corp_code', '').strip(),
+                corp_name=corp_name,
+                stock_code=corp.findtext('stock_code', '').strip()
+            ))
+        return companies
+
+    def _build_listed_index(self, companies: List[CompanyInfo]) -> Dict:
+        """상장기업(주식코드 보유)만 추린 컴팩트 인덱스 생성"""
+        rows = sorted(
+            [[c.corp_code, c.corp_name, c.stock_code] for c in companies if c.stock_code],
+            key=lambda row: row[0]
+        )
+        digest = hashlib.sha1(
+            json.dumps(rows, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        ).hexdigest()
+        return {
+            'version': digest[:16],
+            'fields': ['corp_code', 'corp_name', 'stock_code'],
+            'companies': rows
+        }
+
+    def get_financial_statements(self, corp_code: str, year: str, use_cache: bool = True) -> Dict:
+        """재무제표 정보 조회 (캐시 -> 연결 -> 개별 순차 조회)"""
+        cache_key = (corp_code, year)
+        if use_cache:
+            cached = self.statement_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"재무제표 캐시 사용: {corp_code}, {year}년")
+                return cached
+        
+        try:
+            result = self._fetch_financial_statements(corp_code, year)
+        except DARTUnavailableException:
+            # DART 장애 중에는 만료된 캐시라도 있으면 제공
+            stale = self.statement_cache.get_stale(cache_key)
+            if stale is not None:
+                logger.warning(f"DART 장애로 만료된 재무제표 캐시 사용: {corp_code}, {year}년")
+                return stale
+            raise
+        self.statement_cache.set(cache_key, result)
+        if self.timeseries_store is not None:
+            try:
+                self.timeseries_store.ingest(corp_code, year, result)
+            except Exception as e:
+                logger.error(f"시계열 저장소 적재 오류: {e}")
+        return result
+
+    def invalidate_financial_statements(self, corp_code: str, year: str) -> bool:
+        """캐시된 재무제표 무효화 (캐시에 있었는지 여부 반환)"""
+        return self.statement_cache.invalidate((corp_code, year))
+
+    def list_disclosures(self, bgn_de: str, end_de: str, page_no: int = 1,
+                         pblntf_detail_ty: str = 'A001', page_count: int = 100) -> Dict:
+        """공시 목록 조회 (기본값: 사업보고서 A001)
+
+        corp_code 없이 조회하므로 DART 제약상 기간은 3개월 이내여야 합니다.
+        """
+        params = {
+            'crtfc_key': self.api_key,
+            'bgn_de': bgn_de,
+            'end_de': end_de,
+            'pblntf_detail_ty': pblntf_detail_ty,
+            'last_reprt_at': 'N',  # 정정 이전 원본 공시도 포함
+            'sort': 'date',
+            'sort_mth': 'asc',
+            'page_no': page_no,
+            'page_count': page_count
+        }
+        response = self._request_get(f"{self.base_url}/list.json", params)
+        result = response.json()
+        
+        status = result.get('status')
+        if status == '013':  # 조회된 데이터 없음
+            return {'list': [], 'total_page': 0, 'page_no': page_no}
+        if status != '000':
+            raise DARTApiException(f"공시 목록 조회 오류: {result.get('message', 'Unknown error')}")
+        return result
 
-    def get_financial_statements(self, corp_code: str, year: str) -> Dict:
-        """재무제표 정보 조회 (연결 -> 개별 순차 조회)"""
+    def _fetch_financial_statements(self, corp_code: str, year: str) -> Dict:
+        """DART에서 재무제표 조회 (연결 -> 개별 순차 조회)"""
         logger.info(f"재무제표 조회 시작: {corp_code}, {year}년")
         
+        # 모든 구분에서 '데이터 없음'(013)을 받은 경우에만 NotFound로 판단
+        all_not_found = True
         for fs_div in ['CFS', 'OFS']:  # 연결(CFS) 먼저, 없으면 개별(OFS)
             params = {
                 'crtfc_key': self.api_key, 
@@ -71,24 +239,30 @@ class DARTClient:
             }
             
             try:
-                response = self._request_get(f"{self.base_url}/fnlttSinglAcnt.json", params)
+                response = self._request_get(f"{self.base_url}/fnlttSinglAcnt.json", params, hedge=True)
                 result = response.json()
                 
                 if result.get('status') == '000' and result.get('list'):
                     logger.info(f"{year}년 재무제표 조회 성공 (구분: {fs_div})")
                     return result
-                elif result.get('status') == '013':
+                elif result.get('status') in ('013', '000'):
                     logger.warning(f"{year}년 {fs_div} 재무제표 없음, 다른 구분 시도")
                     continue
                 else:
+                    all_not_found = False
                     logger.warning(f"DART API 응답 오류: {result.get('message', 'Unknown error')}")
                     
+            except DARTUnavailableException:
+                raise
             except Exception as e:
+                all_not_found = False
                 logger.error(f"재무제표 API 호출 오류: {e}")
                 continue
         
         # 모든 시도 실패
-        raise DARTApiException(f"{year}년도 재무제표 데이터를 찾을 수 없습니다.")
+        if all_not_found:
+            raise DARTNotFoundException(f"{year}년도 재무제표 데이터를 찾을 수 없습니다.")
+        raise DARTApiException(f"{year}년도 재무제표 조회 중 오류가 발생했습니다.")
 
     def _extract_zip_content(self, content: bytes) -> bytes:
         """ZIP 파일 압축 해제"""
@@ -0,0 +1,160 @@
+# disclosure_sync.py
+"""DART 공시 목록을 주기적으로 조회하여 신규/정정 사업보고서가 나온 기업의 캐시만 무효화합니다."""
+import logging
+import re
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from src.dart_client import DARTClient, DARTApiException
+from src.timeseries_store import TimeSeriesStore
+
+logger = logging.getLogger(__name__)
+
+# "[기재정정]사업보고서 (2023.12)" -> 2023
+REPORT_YEAR_PATTERN = re.compile(r'사업보고서\s*\((\d{4})\.\d{2}\)')
+AMENDMENT_PREFIXES = ('[기재정정]', '[첨부정정]', '[첨부추가]', '[변경등록]')
+
+class DisclosureSyncWorker:
+    """공시 목록(list.json) 증분 동기화 백그라운드 워커
+
+    커서는 마지막 접수일자와 그날 처리한 접수번호로 구성되며 두 가지를 따로 유지합니다.
+    - 메모리 캐시용 커서: 프로세스별 메모리에 보관. 재시작하면 메모리 캐시도 비므로 오늘부터 추적합니다.
+    - 시계열 저장소용 커서: 저장소(SQLite)에 보관. 저장소는 재시작 후에도 남으므로
+      프로세스가 없던 동안의 공시까지 이어서 반영합니다.
+    """
+    def __init__(self, dart_client: DARTClient, interval: int = 600,
+                 listeners: Optional[List[Callable[[str, str], None]]] = None,
+                 timeseries_store: Optional[TimeSeriesStore] = None):
+        self.dart_client = dart_client
+        self.interval = interval
+        self.timeseries_store = timeseries_store
+        self._cursor = self._initial_cursor()
+        # 무효화된 (corp_code, year)를 전달받을 콜백 (예: AI 분석 캐시 정리)
+        self.listeners = listeners or []
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='dart-disclosure-sync', daemon=True)
+        self._thread.start()
+        logger.info(f"공시 동기화 워커 시작 (주기: {self.interval}초)")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"공시 동기화 오류: {e}", exc_info=True)
+            self._stop_event.wait(self.interval)
+
+    def run_once(self) -> int:
+        """커서 이후 공시를 한 번 동기화하고 메모리 캐시에서 무효화한 (corp_code, year) 개수 반환"""
+        store_cursor = None
+        if self.timeseries_store is not None:
+            store_cursor = self.timeseries_store.load_sync_cursor(self._initial_cursor())
+
+        today = datetime.now().strftime('%Y%m%d')
+        # list.json은 corp_code 없이 최대 3개월까지만 조회 가능
+        min_bgn_de = (datetime.now() - timedelta(days=89)).strftime('%Y%m%d')
+        oldest = min(c['last_rcept_dt'] for c in (self._cursor, store_cursor) if c is not None)
+        if oldest < min_bgn_de:
+            logger.warning(f"동기화 커서가 조회 가능 기간보다 오래됨 ({oldest}), {min_bgn_de}부터 조회")
+        disclosures = self._fetch_since(max(oldest, min_bgn_de), today)
+
+        changed = self._collect_changes(disclosures, self._cursor)
+        for (corp_code, year), report_nm in changed.items():
+            self._apply_change(corp_code, year, report_nm)
+        self._cursor = self._advance(self._cursor, disclosures)
+
+        if store_cursor is not None:
+            store_changed = self._collect_changes(disclosures, store_cursor)
+            for corp_code, year in store_changed:
+                self.timeseries_store.invalidate_report(corp_code, year)
+            # 다른 프로세스가 먼저 커서를 옮겼다면 같은 공시를 이미 반영한 것이므로 덮어쓰지 않음
+            self.timeseries_store.save_sync_cursor(self._advance(store_cursor, disclosures), expected=store_cursor)
+
+        if changed:
+            logger.info(f"공시 동기화 완료: {len(changed)}건 무효화 (커서: {self._cursor['last_rcept_dt']})")
+        return len(changed)
+
+    @staticmethod
+    def _initial_cursor() -> Dict:
+        return {'last_rcept_dt': datetime.now().strftime('%Y%m%d'), 'seen_rcept_nos': []}
+
+    @staticmethod
+    def _is_new(item: Dict, cursor: Dict) -> bool:
+        rcept_no = item.get('rcept_no', '')
+        rcept_dt = item.get('rcept_dt', '')
+        if not rcept_no:
+            return False
+        return rcept_dt > cursor['last_rcept_dt'] or (
+            rcept_dt == cursor['last_rcept_dt'] and rcept_no not in cursor['seen_rcept_nos']
+        )
+
+    def _collect_changes(self, disclosures: List[Dict], cursor: Dict) -> Dict[Tuple[str, str], str]:
+        """커서 이후의 사업보고서 공시에서 (corp_code, year) -> 보고서명 추출"""
+        changed: Dict[Tuple[str, str], str] = {}
+        for item in disclosures:
+            if not self._is_new(item, cursor):
+                continue
+            year = self._parse_report_year(item.get('report_nm', ''))
+            if year and item.get('corp_code'):
+                changed[(item['corp_code'], year)] = item.get('report_nm', '')
+        return changed
+
+    def _advance(self, cursor: Dict, disclosures: List[Dict]) -> Dict:
+        """처리한 공시(접수일자 오름차순)를 반영한 새 커서 반환"""
+        last_rcept_dt, last_seen = cursor['last_rcept_dt'], set(cursor['seen_rcept_nos'])
+        for item in disclosures:
+            if not self._is_new(item, cursor):
+                continue
+            rcept_dt = item['rcept_dt']
+            if rcept_dt > last_rcept_dt:
+                last_rcept_dt, last_seen = rcept_dt, set()
+            if rcept_dt == last_rcept_dt:
+                last_seen.add(item['rcept_no'])
+        return {'last_rcept_dt': last_rcept_dt, 'seen_rcept_nos': sorted(last_seen)}
+
+    def _fetch_since(self, bgn_de: str, end_de: str) -> List[Dict]:
+        """기간 내 사업보고서 공시를 모든 페이지에 걸쳐 조회"""
+        disclosures = []
+        page_no = 1
+        while True:
+            result = self.dart_client.list_disclosures(bgn_de, end_de, page_no=page_no)
+            disclosures.extend(result.get('list', []))
+            if page_no >= int(result.get('total_page') or 0):
+                break
+            page_no += 1
+        return sorted(disclosures, key=lambda item: (item.get('rcept_dt', ''), item.get('rcept_no', '')))
+
+    def _apply_change(self, corp_code: str, year: str, report_nm: str) -> None:
+        """캐시 무효화 후, 캐시에 있던 재무제표는 최신 공시로 다시 채움"""
+        was_cached = self.dart_client.invalidate_financial_statements(corp_code, year)
+        kind = '정정' if report_nm.startswith(AMENDMENT_PREFIXES) else '신규'
+        logger.info(f"{kind} 사업보고서 감지: {corp_code} {year}년 ({report_nm})")
+
+        for listener in self.listeners:
+            try:
+                listener(corp_code, year)
+            except Exception as e:
+                logger.error(f"무효화 콜백 오류: {e}")
+
+        if was_cached:
+            try:
+                self.dart_client.get_financial_statements(corp_code, year, use_cache=False)
+                logger.info(f"재무제표 재적재 완료: {corp_code} {year}년")
+            except DARTApiException as e:
+                logger.warning(f"재무제표 재적재 실패: {corp_code} {year}년 - {e}")
+
+    @staticmethod
+    def _parse_report_year(report_nm: str) -> Optional[str]:
+        match = REPORT_YEAR_PATTERN.search(report_nm)
+        return match.group(1) if match else None
@@ -0,0 +1,239 @@
+# resilience.py
+"""DART/Gemini 등 외부 호출에 공통으로 적용하는 데드라인, 헤지 요청, 서킷 브레이커를 제공합니다."""
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import Executor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class DeadlineExceeded(TimeoutError):
+    """요청에 할당된 시간 예산이 소진됨"""
+    pass
+
+class BudgetExhausted(DeadlineExceeded):
+    """호출자 데드라인 때문에 짧아진 타임아웃이 만료됨 (외부 서비스 실패로 집계하지 않음)"""
+    pass
+
+class CircuitOpenError(ConnectionError):
+    """서킷 브레이커가 열려 있어 외부 호출을 차단함"""
+    pass
+
+# --- 데드라인 ---
+class Deadline:
+    """요청 단위 시간 예산"""
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+_current_deadline: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar('deadline', default=None)
+
+def start_deadline(seconds: float) -> contextvars.Token:
+    """현재 컨텍스트(요청 스레드)에 데드라인 설정. 반환된 토큰으로 reset_deadline 호출"""
+    return _current_deadline.set(Deadline(seconds))
+
+def reset_deadline(token: contextvars.Token) -> None:
+    _current_deadline.reset(token)
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+def budget_timeout(default: float) -> float:
+    """기본 타임아웃과 남은 데드라인 중 작은 값 반환 (데드라인이 없으면 기본값)"""
+    deadline = current_deadline()
+    if deadline is None:
+        return default
+    remaining = deadline.remaining()
+    if remaining <= 0:
+        raise DeadlineExceeded("요청 처리 시간 예산을 초과했습니다.")
+    return min(default, remaining)
+
+def is_timeout_error(error: BaseException) -> bool:
+    """requests Timeout, google api_core DeadlineExceeded 등 타임아웃 계열 예외 여부"""
+    if isinstance(error, TimeoutError):
+        return True
+    name = type(error).__name__
+    return 'Timeout' in name or 'DeadlineExceeded' in name
+
+def run_with_budget(fn: Callable, timeout: float, default_timeout: float) -> Any:
+    """fn 실행. timeout이 데드라인 때문에 기본값보다 크게 줄어든 상태에서 시간 초과되면 BudgetExhausted로 변환
+
+    서킷 브레이커는 BudgetExhausted를 실패로 세지 않으므로, 마감 직전 요청의 짧은 타임아웃이
+    모든 사용자의 브레이커를 여는 일을 막습니다.
+    """
+    try:
+        return fn()
+    except Exception as e:
+        if timeout < default_timeout * 0.9 and is_timeout_error(e):
+            raise BudgetExhausted(f"요청 시간 예산 부족으로 {timeout:.1f}초 내에 완료되지 않았습니다.") from e
+        raise
+
+# --- 타임아웃 / 헤지 호출 ---
+# 실행 중인 호출은 취소할 수 없으므로 외부 서비스마다 별도 executor를 사용해야
+# 한쪽 장애로 묶인 스레드가 다른 서비스 호출을 막지 않습니다.
+def call_with_timeout(executor: Executor, fn: Callable, timeout: float, *args, **kwargs) -> Any:
+    """호출을 executor에서 실행하고 timeout 초까지만 대기 (fn 자체에도 타임아웃을 전달해야 스레드가 회수됨)"""
+    future = executor.submit(fn, *args, **kwargs)
+    done, _ = wait([future], timeout=timeout)
+    if not done:
+        future.cancel()
+        raise DeadlineExceeded(f"외부 호출이 {timeout:.1f}초 내에 완료되지 않았습니다.")
+    return future.result()
+
+def hedged_call(executor: Executor, fn: Callable, hedge_delay: float, timeout: float) -> Any:
+    """fn을 실행하고 hedge_delay 초 내에 끝나지 않으면 같은 호출을 한 번 더 보내 먼저 성공한 결과 사용
+
+    fn은 멱등이어야 합니다 (예: GET 요청).
+    """
+    started = time.monotonic()
+    pending = {executor.submit(fn)}
+    done, pending = wait(pending, timeout=min(hedge_delay, timeout))
+    if not done:
+        logger.info(f"응답 지연({hedge_delay:.1f}초 초과), 헤지 요청 전송")
+        pending.add(executor.submit(fn))
+
+    last_error: Optional[BaseException] = None
+    while True:
+        for future in done:
+            if future.exception() is None:
+                for other in pending:
+                    other.cancel()
+                return future.result()
+            last_error = future.exception()
+        if not pending:
+            raise last_error
+        remaining = timeout - (time.monotonic() - started)
+        if remaining <= 0:
+            for other in pending:
+                other.cancel()
+            raise DeadlineExceeded(f"외부 호출이 {timeout:.1f}초 내에 완료되지 않았습니다.")
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+
+def describe_error(error: BaseException) -> str:
+    """예외 종류와 HTTP 상태코드만 반환 (requests 오류 메시지에는 API 키가 포함된 URL이 들어있음)"""
+    status_code = getattr(getattr(error, 'response', None), 'status_code', None)
+    if status_code is not None:
+        return f"{type(error).__name__} (HTTP {status_code})"
+    return type(error).__name__
+
+# --- 서킷 브레이커 ---
+class CircuitBreaker:
+    """외부 서비스별 서킷 브레이커 (closed -> open -> half_open)
+
+    연속 실패가 failure_threshold에 도달하면 reset_timeout 동안 호출을 즉시 거부하고,
+    이후 시험 호출 1건이 성공하면 다시 닫힙니다.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._half_open_in_flight = False
+        self._consecutive_failures = 0
+        self._lock = threading.Lock()
+        self._metrics = {
+            'calls': 0,
+            'failures': 0,
+            'rejected': 0,
+            'opened': 0,
+            'last_failure': ''
+        }
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._half_open_in_flight = False
+        return self._state
+
+    def _acquire(self) -> None:
+        with self._lock:
+            state = self._current_state()
+            if state == self.OPEN or (state == self.HALF_OPEN and self._half_open_in_flight):
+                self._metrics['rejected'] += 1
+                raise CircuitOpenError(f"{self.name} 서비스 장애로 요청을 일시 차단 중입니다.")
+            if state == self.HALF_OPEN:
+                self._half_open_in_flight = True
+            self._metrics['calls'] += 1
+
+    def _on_success(self) -> None:
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"서킷 브레이커 닫힘: {self.name}")
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._half_open_in_flight = False
+
+    def _on_neutral(self) -> None:
+        """성공/실패로 집계하지 않는 결과 (half_open 시험 호출 슬롯만 반환)"""
+        with self._lock:
+            self._half_open_in_flight = False
+
+    def _on_failure(self, error: BaseException) -> None:
+        with self._lock:
+            self._metrics['failures'] += 1
+            self._metrics['last_failure'] = describe_error(error)
+            self._consecutive_failures += 1
+            self._half_open_in_flight = False
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._metrics['opened'] += 1
+                    logger.warning(f"서킷 브레이커 열림: {self.name} (연속 실패 {self._consecutive_failures}회)")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def call(self, fn: Callable, *args, **kwargs) -> Any:
+        self._acquire()
+        try:
+            result = fn(*args, **kwargs)
+        except BudgetExhausted:
+            self._on_neutral()
+            raise
+        except Exception as e:
+            self._on_failure(e)
+            raise
+        self._on_success()
+        return result
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            state = self._current_state()
+            return {
+                'state': state,
+                'consecutive_failures': self._consecutive_failures,
+                'open_for_seconds': round(time.monotonic() - self._opened_at, 1) if state != self.CLOSED else 0,
+                **self._metrics
+            }
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(name: str, **kwargs) -> CircuitBreaker:
+    """이름별 서킷 브레이커 반환 (없으면 생성)"""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, **kwargs)
+        return _breakers[name]
+
+def breaker_metrics() -> Dict[str, Dict]:
+    """등록된 모든 서킷 브레이커 상태"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
@@ -0,0 +1,263 @@
+# timeseries_store.py
+"""기업별 주요 계정의 다년도 시계열을 로컬 SQLite에 보관하고 정렬된 비교 시계열을 제공합니다."""
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# fnlttSinglAcnt 계정명(공백/괄호 제거) -> 컬럼명
+ACCOUNT_COLUMNS = {
+    '매출액': 'revenue',
+    '영업이익': 'operating_income',
+    '법인세차감전순이익': 'pretax_income',
+    '당기순이익': 'net_income',
+    '유동자산': 'current_assets',
+    '비유동자산': 'noncurrent_assets',
+    '자산총계': 'total_assets',
+    '유동부채': 'current_liabilities',
+    '비유동부채': 'noncurrent_liabilities',
+    '부채총계': 'total_liabilities',
+    '자본금': 'capital_stock',
+    '이익잉여금': 'retained_earnings',
+    '자본총계': 'total_equity',
+}
+COLUMN_LABELS = {column: label for label, column in ACCOUNT_COLUMNS.items()}
+ACCOUNTS = list(ACCOUNT_COLUMNS.values())
+
+# 사업보고서 한 건에 담긴 당기/전기/전전기 금액 필드와 연도 차이
+PERIOD_FIELDS = [('thstrm_amount', 0), ('frmtrm_amount', 1), ('bfefrmtrm_amount', 2)]
+
+# 사업보고서가 없던 연도는 이 시간 동안 다시 조회하지 않음
+MISSING_RETRY_SECONDS = 24 * 3600
+
+class TimeSeriesStore:
+    """(corp_code, year, fs_div) 단위로 주요 계정을 컬럼에 저장하는 시계열 저장소
+
+    같은 연도가 여러 사업보고서에 등장하면(당기/전기/전전기) 가장 최근 보고서 값이 우선합니다.
+    """
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._write_lock = threading.Lock()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._create_tables()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _create_tables(self) -> None:
+        account_columns = ', '.join(f'{column} INTEGER' for column in ACCOUNTS)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS statements (
+                    corp_code TEXT NOT NULL,
+                    year INTEGER NOT NULL,
+                    fs_div TEXT NOT NULL,
+                    source_year INTEGER NOT NULL,
+                    {account_columns},
+                    PRIMARY KEY (corp_code, year, fs_div)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS missing_reports (
+                    corp_code TEXT NOT NULL,
+                    year INTEGER NOT NULL,
+                    checked_at REAL NOT NULL,
+                    PRIMARY KEY (corp_code, year)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                )
+            """)
+
+    # --- 적재 ---
+    def ingest(self, corp_code: str, year: str, result: Dict) -> int:
+        """fnlttSinglAcnt 응답을 연도별 행으로 펼쳐 저장하고 저장된 행 수 반환"""
+        source_year = int(year)
+        rows: Dict[tuple, Dict[str, int]] = {}
+        for item in result.get('list', []):
+            column = ACCOUNT_COLUMNS.get(self._normalize_account(item.get('account_nm', '')))
+            fs_div = item.get('fs_div')
+            if not column or fs_div not in ('CFS', 'OFS'):
+                continue
+            for field, offset in PERIOD_FIELDS:
+                amount = self._parse_amount(item.get(field))
+                if amount is not None:
+                    rows.setdefault((source_year - offset, fs_div), {})[column] = amount
+
+        if not rows:
+            return 0
+
+        columns = ', '.join(ACCOUNTS)
+        placeholders = ', '.join('?' for _ in ACCOUNTS)
+        updates = ', '.join(f'{column} = COALESCE(excluded.{column}, {column})' for column in ACCOUNTS)
+        sql = f"""
+            INSERT INTO statements (corp_code, year, fs_div, source_year, {columns})
+            VALUES (?, ?, ?, ?, {placeholders})
+            ON CONFLICT (corp_code, year, fs_div) DO UPDATE SET
+                source_year = excluded.source_year, {updates}
+            WHERE excluded.source_year >= statements.source_year
+        """
+        params = [
+            (corp_code, row_year, fs_div, source_year, *[values.get(column) for column in ACCOUNTS])
+            for (row_year, fs_div), values in rows.items()
+        ]
+        with self._write_lock, closing(self._connect()) as conn, conn:
+            conn.executemany(sql, params)
+            conn.execute("DELETE FROM missing_reports WHERE corp_code = ? AND year = ?", (corp_code, source_year))
+        return len(params)
+
+    def mark_missing(self, corp_code: str, year: str) -> None:
+        """해당 연도 사업보고서가 없음을 기록 (MISSING_RETRY_SECONDS 동안 재조회 생략)"""
+        with self._write_lock, closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO missing_reports (corp_code, year, checked_at) VALUES (?, ?, ?)",
+                (corp_code, int(year), time.time())
+            )
+
+    def invalidate_report(self, corp_code: str, year: str) -> None:
+        """신규/정정 사업보고서 공시 시 해당 보고서에서 온 행을 제거해 다음 조회 때 다시 채움"""
+        with self._write_lock, closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM statements WHERE corp_code = ? AND source_year = ?", (corp_code, int(year)))
+            conn.execute("DELETE FROM missing_reports WHERE corp_code = ? AND year = ?", (corp_code, int(year)))
+
+    # --- 공시 동기화 커서 ---
+    # 저장소는 재시작 후에도 남아 있으므로, 프로세스가 없던 동안의 공시도 놓치지 않도록 커서를 함께 보관
+    def load_sync_cursor(self, initial: Dict) -> Dict:
+        """저장된 공시 동기화 커서 반환 (없으면 initial로 초기화)"""
+        with self._write_lock, closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO sync_state (key, value) VALUES ('disclosure_cursor', ?)",
+                (self._encode_cursor(initial),)
+            )
+            row = conn.execute("SELECT value FROM sync_state WHERE key = 'disclosure_cursor'").fetchone()
+        return json.loads(row[0])
+
+    def save_sync_cursor(self, cursor: Dict, expected: Dict) -> bool:
+        """커서가 아직 expected일 때만 갱신 (다른 프로세스가 먼저 진행했으면 False)"""
+        with self._write_lock, closing(self._connect()) as conn, conn:
+            updated = conn.execute(
+                "UPDATE sync_state SET value = ? WHERE key = 'disclosure_cursor' AND value = ?",
+                (self._encode_cursor(cursor), self._encode_cursor(expected))
+            ).rowcount
+        return updated == 1
+
+    @staticmethod
+    def _encode_cursor(cursor: Dict) -> str:
+        return json.dumps(
+            {'last_rcept_dt': cursor['last_rcept_dt'], 'seen_rcept_nos': sorted(cursor['seen_rcept_nos'])},
+            sort_keys=True
+        )
+
+    def ensure(self, corp_code: str, years: Iterable[int], dart_client, max_fetches: Optional[int] = None) -> int:
+        """저장소에 없는 연도만 DART에서 조회하여 채우고 조회한 보고서 수 반환 (보고서 1건이 3개 연도를 채움)
+
+        DARTClient에 이 저장소가 연결되어 있어야 조회 결과가 적재됩니다.
+        max_fetches에 도달하면 남은 연도는 채우지 않습니다.
+        """
+        from src.dart_client import DARTNotFoundException
+
+        fetches = 0
+        for year in sorted(set(int(y) for y in years), reverse=True):
+            if year in self._covered_years(corp_code):
+                continue
+            if max_fetches is not None and fetches >= max_fetches:
+                break
+            fetches += 1
+            try:
+                dart_client.get_financial_statements(corp_code, str(year), use_cache=False)
+            except DARTNotFoundException:
+                # 일시적 오류(네트워크, 요청 한도 등)는 기록하지 않고 호출자에게 전파
+                self.mark_missing(corp_code, str(year))
+        return fetches
+
+    def _covered_years(self, corp_code: str) -> set:
+        with closing(self._connect()) as conn:
+            covered = {row[0] for row in conn.execute(
+                "SELECT DISTINCT year FROM statements WHERE corp_code = ?", (corp_code,)
+            )}
+            covered.update(row[0] for row in conn.execute(
+                "SELECT year FROM missing_reports WHERE corp_code = ? AND checked_at > ?",
+                (corp_code, time.time() - MISSING_RETRY_SECONDS)
+            ))
+        return covered
+
+    # --- 조회 ---
+    def query(self, corp_codes: List[str], start_year: int, end_year: int,
+              accounts: Optional[List[str]] = None, fs_div: str = 'auto') -> Dict:
+        """여러 기업의 다년도 시계열을 연도 축에 맞춰 반환
+
+        fs_div='auto'이면 기업별로 연결(CFS) 데이터가 있으면 연결, 없으면 개별(OFS)을 사용합니다.
+        값이 없는 연도는 None으로 채워 모든 시계열의 길이가 같습니다.
+        """
+        accounts = [a for a in (accounts or ACCOUNTS) if a in COLUMN_LABELS]
+        years = list(range(int(start_year), int(end_year) + 1))
+        result = {'years': years, 'accounts': accounts, 'fs_div': {}, 'series': {}}
+        if not accounts:
+            return result
+
+        columns = ', '.join(accounts)
+        with closing(self._connect()) as conn:
+            for corp_code in corp_codes:
+                rows = conn.execute(
+                    f"SELECT year, fs_div, {columns} FROM statements "
+                    f"WHERE corp_code = ? AND year BETWEEN ? AND ?",
+                    (corp_code, years[0], years[-1])
+                ).fetchall()
+
+                by_div: Dict[str, Dict[int, tuple]] = {'CFS': {}, 'OFS': {}}
+                for row in rows:
+                    by_div[row[1]][row[0]] = row[2:]
+
+                selected = fs_div if fs_div in by_div else ('CFS' if by_div['CFS'] else 'OFS')
+                values_by_year = by_div[selected]
+                result['fs_div'][corp_code] = selected
+                result['series'][corp_code] = {
+                    account: [values_by_year[year][i] if year in values_by_year else None for year in years]
+                    for i, account in enumerate(accounts)
+                }
+        return result
+
+    @staticmethod
+    def to_prompt_table(result: Dict, corp_code: str) -> Optional[Dict]:
+        """query 결과에서 한 기업의 시계열을 프롬프트용 컴팩트 표로 변환 (데이터 없으면 None)"""
+        series = result['series'].get(corp_code, {})
+        table = {label: values for label, values in
+                 ((COLUMN_LABELS[account], values) for account, values in series.items())
+                 if any(v is not None for v in values)}
+        if not table:
+            return None
+        return {
+            '연도': result['years'],
+            '구분': '연결' if result['fs_div'].get(corp_code) == 'CFS' else '개별',
+            '단위': '원',
+            **table
+        }
+
+    @staticmethod
+    def _normalize_account(account_nm: str) -> str:
+        # "당기순이익(손실)", "법인세차감전 순이익" 등 표기 차이 제거
+        return re.sub(r'\(.*?\)|\s', '', account_nm)
+
+    @staticmethod
+    def _parse_amount(value) -> Optional[int]:
+        if value is None:
+            return None
+        text = str(value).replace(',', '').strip()
+        if not text or text == '-':
+            return None
+        try:
+            return int(text)
+        except ValueError:
+            return None
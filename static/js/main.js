@@ -119,8 +119,84 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     };
 
-    // 회사 검색 함수
+    // 상장기업 인덱스 (브라우저 내 즉시 검색용)
+    const SEARCH_DEBOUNCE_MS = 150;
+    const SEARCH_RESULT_LIMIT = 10;
+    let companyIndex = null;
+    let searchDebounceTimer = null;
+    // 검색/입력/기업 선택 시 증가. 응답 도착 시 값이 바뀌었으면 지난 검색 결과로 보고 버림
+    let searchSeq = 0;
+
+    const normalizeKeyword = (text) => text.toLowerCase().replace(/\s+/g, '');
+
+    async function loadCompanyIndex() {
+        try {
+            // 서버가 gzip + ETag로 내려주므로 브라우저 HTTP 캐시가 재사용됨
+            const index = await api.get('/api/companies/index');
+            const fields = index.fields;
+            const codeIdx = fields.indexOf('corp_code');
+            const nameIdx = fields.indexOf('corp_name');
+            const stockIdx = fields.indexOf('stock_code');
+            
+            companyIndex = index.companies.map(row => ({
+                corp_code: row[codeIdx],
+                corp_name: row[nameIdx],
+                stock_code: row[stockIdx],
+                key: normalizeKeyword(row[nameIdx])
+            }));
+            console.log(`✅ 기업 인덱스 로드 완료 (v${index.version}, ${companyIndex.length}개)`);
+        } catch (error) {
+            // 인덱스가 없으면 서버 검색으로만 동작
+            console.warn('⚠️ 기업 인덱스 로드 실패, 서버 검색을 사용합니다:', error);
+            companyIndex = null;
+        }
+    }
+
+    function searchLocal(companyName) {
+        if (!companyIndex) return null;
+        
+        const keyword = normalizeKeyword(companyName);
+        if (!keyword) return [];
+        
+        // 종목코드 일치 > 기업명 접두 일치 > 기업명 부분 일치 순으로 정렬
+        const exactMatches = [];
+        const prefixMatches = [];
+        const partialMatches = [];
+        for (const company of companyIndex) {
+            if (company.stock_code === keyword) {
+                exactMatches.push(company);
+            } else if (company.key.startsWith(keyword)) {
+                prefixMatches.push(company);
+            } else if (company.key.includes(keyword)) {
+                partialMatches.push(company);
+            }
+        }
+        
+        prefixMatches.sort((a, b) => a.key.length - b.key.length);
+        return exactMatches.concat(prefixMatches, partialMatches).slice(0, SEARCH_RESULT_LIMIT);
+    }
+
+    // 입력 중 즉시 검색 (로컬 인덱스만 사용, 서버 호출 없음)
+    function handleSearchInput() {
+        clearTimeout(searchDebounceTimer);
+        searchSeq++;
+        searchDebounceTimer = setTimeout(() => {
+            const companyName = companyNameInput.value.trim();
+            if (!companyName) {
+                searchResults.style.display = 'none';
+                return;
+            }
+            
+            const companies = searchLocal(companyName);
+            if (companies === null) return;
+            displaySearchResults(companies, 'Enter를 누르면 비상장 기업까지 검색합니다.');
+        }, SEARCH_DEBOUNCE_MS);
+    }
+
+    // 회사 검색 함수 (로컬 인덱스 결과를 먼저 보여주고, 서버 검색으로 비상장 기업까지 합침)
     async function searchCompany() {
+        clearTimeout(searchDebounceTimer);
+        const seq = ++searchSeq;
         const companyName = companyNameInput.value.trim();
         console.log('검색 시작:', companyName);
         
@@ -130,12 +206,19 @@ document.addEventListener('DOMContentLoaded', () => {
             return;
         }
 
+        const localResults = searchLocal(companyName) || [];
+        const hasLocalResults = localResults.length > 0;
+        if (hasLocalResults) {
+            displaySearchResults(localResults);
+        }
+
         if (companyName.length < 2) {
-            showError('회사명은 2글자 이상 입력해주세요.');
+            if (!hasLocalResults) showError('회사명은 2글자 이상 입력해주세요.');
             return;
         }
 
-        showLoading('기업을 검색하고 있습니다...');
+        // 로컬 결과가 이미 표시된 경우에는 화면을 가리지 않고 백그라운드로 조회
+        if (!hasLocalResults) showLoading('기업을 검색하고 있습니다...');
         searchBtn.disabled = true;
         
         try {
@@ -143,21 +226,29 @@ document.addEventListener('DOMContentLoaded', () => {
             const response = await api.post('/api/search', { company_name: companyName });
             console.log('API 응답:', response);
             
+            // 그 사이 다른 검색어를 입력했거나 기업을 선택했으면 결과를 표시하지 않음
+            if (seq !== searchSeq || companyNameInput.value.trim() !== companyName) {
+                console.log('지난 검색 응답 무시:', companyName);
+                return;
+            }
+            
             if (response.success) {
-                displaySearchResults(response.data.companies);
-            } else {
+                const localCodes = new Set(localResults.map(c => c.corp_code));
+                const serverOnly = response.data.companies.filter(c => !localCodes.has(c.corp_code));
+                displaySearchResults(localResults.concat(serverOnly));
+            } else if (!hasLocalResults) {
                 showError(response.error || '검색 중 오류가 발생했습니다.');
             }
         } catch (error) {
             console.error('검색 오류:', error);
-            showError(error.message || '검색 중 오류가 발생했습니다.');
+            if (!hasLocalResults && seq === searchSeq) showError(error.message || '검색 중 오류가 발생했습니다.');
         } finally {
             hideLoading();
             searchBtn.disabled = false;
         }
     }
 
-    function displaySearchResults(companies) {
+    function displaySearchResults(companies, emptyHint = '다른 키워드로 검색해보세요.') {
         console.log('검색 결과 표시:', companies);
         
         if (!companies || companies.length === 0) {
@@ -165,7 +256,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 <div class="no-results">
                     <i class="fas fa-search" style="font-size: 2rem; color: var(--text-secondary); margin-bottom: 1rem;"></i>
                     <p>검색된 기업이 없습니다.</p>
-                    <small>다른 키워드로 검색해보세요.</small>
+                    <small>${emptyHint}</small>
                 </div>
             `;
         } else {
@@ -189,6 +280,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
     async function selectCompany({ corpCode, corpName }) {
         console.log('기업 선택:', corpName, corpCode);
+        searchSeq++;
         showLoading(`${corpName} 재무정보를 가져오고 있습니다...`);
         
         try {
@@ -379,6 +471,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
     // 이벤트 리스너 등록 (함수들이 정의된 후에 등록)
     searchBtn.addEventListener('click', searchCompany);
+    companyNameInput.addEventListener('input', handleSearchInput);
     companyNameInput.addEventListener('keypress', (e) => {
         if (e.key === 'Enter') {
             e.preventDefault();
@@ -404,6 +497,11 @@ document.addEventListener('DOMContentLoaded', () => {
     // 페이지 로드 시 입력 필드에 포커스
     companyNameInput.focus();
     
+    // 즉시 검색용 기업 인덱스 미리 로드
+    loadCompanyIndex().then(() => {
+        if (companyNameInput.value.trim()) handleSearchInput();
+    });
+    
     // 디버깅용 로그
     console.log('페이지 로드 완료, 이벤트 리스너 등록됨');
 });
\ No newline at end of file